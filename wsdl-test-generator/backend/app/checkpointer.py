@@ -0,0 +1,48 @@
+# backend/app/checkpointer.py
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class BoundedMemorySaver(MemorySaver):
+    """An in-memory checkpointer that keeps at most `max_entries` threads.
+
+    When a new thread pushes the count over the limit, the thread that was written
+    least recently is evicted together with all of its checkpoints.
+    """
+
+    def __init__(self, *, max_entries: int = 256, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._recent: OrderedDict[str, None] = OrderedDict()
+        # aput runs put in a worker thread, so writes can race.
+        self._lock = threading.Lock()
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        # MemorySaver's storage is a defaultdict; don't let lookups of unknown or
+        # evicted threads insert empty entries that would never be evicted. The
+        # check and the lookup must not interleave with an eviction in put.
+        with self._lock:
+            if config["configurable"]["thread_id"] not in self.storage:
+                return None
+            return super().get_tuple(config)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            saved_config = super().put(config, checkpoint, metadata)
+            self._recent[thread_id] = None
+            self._recent.move_to_end(thread_id)
+            while len(self._recent) > self.max_entries:
+                evicted, _ = self._recent.popitem(last=False)
+                self.storage.pop(evicted, None)
+        return saved_config
@@ -1,159 +1,500 @@
 # backend/app/graph_logic.py
+import asyncio
+import hashlib
+import logging
+import multiprocessing
 import os
 import re
-from typing import TypedDict, List
-from langchain_core.prompts import PromptTemplate
-from langchain_community.llms.ollama import Ollama
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, wraps
+from typing import TypedDict, List, Optional, Tuple
+import httpx
+from lxml import etree
+from ollama import AsyncClient
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph.state import CompiledStateGraph
+
+from .checkpointer import BoundedMemorySaver
+from .prompts import (
+    PREFIX_TEMPLATE,
+    INITIAL_TEMPLATE,
+    FEEDBACK_TEMPLATE,
+    INVALID_XML_FEEDBACK_TEMPLATE,
+)
+
+logger = logging.getLogger(__name__)
 
 # Ensure the Ollama service is accessible. Update if your service runs elsewhere.
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-LLM_MODEL = os.getenv("LLM_MODEL", "llama3")
+# 4-bit K-quant: generation is memory-bandwidth bound, so smaller weights decode faster.
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3:8b-instruct-q4_K_M")
+# Number of generation sessions kept for feedback before the oldest are dropped.
+CHECKPOINT_MAX = int(os.getenv("CHECKPOINT_MAX", "256"))
+# Automatic regenerations when the LLM returns malformed XML, before pausing for the user.
+MAX_AUTO_RETRIES = int(os.getenv("MAX_AUTO_RETRIES", "2"))
+# Upper bound on prompts sent to Ollama concurrently; keep at or below OLLAMA_NUM_PARALLEL.
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "4"))
+# Prompt tokens Ollama evaluates per forward pass during prefill.
+LLM_NUM_BATCH = int(os.getenv("LLM_NUM_BATCH", "512"))
+# Cap on generated tokens per prompt. Lower values return sooner but may cut off the last test cases.
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "4096"))
+# Comma-separated sequences that end generation early.
+LLM_STOP_TOKENS = [token for token in os.getenv("LLM_STOP_TOKENS", "").split(",") if token]
+# Fixed seed with zero temperature makes repeated runs over the same prompt reproducible.
+LLM_SEED = int(os.getenv("LLM_SEED", "94032"))
+# Context window in tokens; must fit the WSDL plus the generated test cases.
+LLM_NUM_CTX = int(os.getenv("LLM_NUM_CTX", "8192"))
+# How long Ollama keeps the model (and its cached prompt prefix) loaded after a request.
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "60m")
+# Completed responses kept in memory, keyed by prompt; 0 disables the cache.
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "128"))
+# Seconds to wait for Ollama between streamed chunks; the first one only arrives once the prompt is evaluated.
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "600"))
+
+_LLM_OPTIONS = {
+    "temperature": 0.0,
+    "seed": LLM_SEED,
+    "num_ctx": LLM_NUM_CTX,
+    "num_batch": LLM_NUM_BATCH,
+    "num_predict": LLM_MAX_TOKENS,
+}
+if LLM_STOP_TOKENS:
+    _LLM_OPTIONS["stop"] = LLM_STOP_TOKENS
+
+# Sized for MAX_BATCH_SIZE prompts per request across many concurrent requests.
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_HTTP_TIMEOUT = httpx.Timeout(LLM_TIMEOUT, connect=10.0)
+
+@lru_cache(maxsize=None)
+def _get_client(base_url: str) -> AsyncClient:
+    """Returns a shared Ollama client so its connection pool is reused across calls."""
+    return AsyncClient(host=base_url, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
 
 class GraphState(TypedDict):
     """Represents the state of our graph."""
-    wsdl_content: str
+    wsdl_id: str  # Key of the uploaded WSDL in the WSDL store
     test_options: List[str]
-    prompt: str
-    generated_xml: str  # The raw XML output from the LLM
-    generated_xmls: List[str]  # The split XML test cases
+    prompt_suffixes: List[Optional[str]]  # Per-test-type part of each prompt; None keeps that type's test cases
+    generated_xml: str  # The raw XML output of the latest LLM call
+    test_cases_by_prompt: List[List[str]]  # The split XML test cases of each test type, in test_options order
+    generated_xmls: List[str]  # All split XML test cases
+    validation_errors: List[List[str]]  # Well-formedness problems per test type, quoted in its retry prompt
+    retry_prompts: List[int]  # Indexes of the test types validate_xml queued for an automatic retry
     feedback_history: List[str]
     error_message: str
     attempt_count: int
+    auto_retry_count: int  # Regenerations triggered by validate_xml rather than the user
+
+# --- WSDL Store ---
+
+# Checkpoints copy the whole state at every node, so the WSDL text is kept here
+# once and the state only carries its content hash.
+# The upload is kept as raw bytes so it is never decoded and re-encoded before lxml parses it.
+_WSDL_STORE: "OrderedDict[str, bytes]" = OrderedDict()
+_WSDL_STORE_LOCK = threading.Lock()
+
+def store_wsdl(wsdl_content: bytes) -> str:
+    """Stores the WSDL and returns the id the graph state refers to it by."""
+    wsdl_id = hashlib.blake2b(wsdl_content, digest_size=16).hexdigest()
+    with _WSDL_STORE_LOCK:
+        _WSDL_STORE[wsdl_id] = wsdl_content
+        _WSDL_STORE.move_to_end(wsdl_id)
+        # A WSDL can't outlive every session that uses it by much, so share the session bound.
+        while len(_WSDL_STORE) > CHECKPOINT_MAX:
+            _WSDL_STORE.popitem(last=False)
+    return wsdl_id
+
+def _load_wsdl(wsdl_id: str) -> bytes:
+    """Returns a stored WSDL, marking it as recently used."""
+    with _WSDL_STORE_LOCK:
+        if wsdl_id not in _WSDL_STORE:
+            raise LookupError("The WSDL for this generation has expired. Please upload it again.")
+        _WSDL_STORE.move_to_end(wsdl_id)
+        return _WSDL_STORE[wsdl_id]
+
+# --- Prompt Helpers ---
+
+# Templates are split around their placeholders once, so prompts are built by concatenation.
+_PREFIX_HEAD, _PREFIX_TAIL = PREFIX_TEMPLATE.split("{wsdl_content}")
+_INITIAL_HEAD, _INITIAL_TAIL = INITIAL_TEMPLATE.split("{test_option}")
+_FEEDBACK_HEAD, _FEEDBACK_MID, _FEEDBACK_TAIL = re.split(r"\{test_option\}|\{feedback\}", FEEDBACK_TEMPLATE)
+_INVALID_XML_HEAD, _INVALID_XML_TAIL = INVALID_XML_FEEDBACK_TEMPLATE.split("{errors}")
+
+# Nothing looks elements up by ID, so skip building the ID table; allow very large WSDLs.
+_WSDL_PARSER = etree.XMLParser(
+    remove_comments=True, remove_blank_text=True, collect_ids=False, huge_tree=True
+)
+
+def _minify_wsdl(wsdl_content: bytes) -> str:
+    """Strips comments and insignificant whitespace so the WSDL costs fewer prompt tokens."""
+    try:
+        root = etree.fromstring(wsdl_content, parser=_WSDL_PARSER)
+    except etree.XMLSyntaxError:
+        # Let the LLM see malformed input as-is rather than failing the generation.
+        return wsdl_content.decode("utf-8", errors="replace")
+    return etree.tostring(root, encoding="unicode")
+
+# Below this size parsing is cheaper than shipping the text to another process.
+_OFFLOAD_THRESHOLD = 64 * 1024
+_PREFIX_CACHE_SIZE = 32
+_PREFIX_CACHE: "OrderedDict[str, str]" = OrderedDict()
+
+# validate_xml asks for the pool from LangGraph's executor threads, and lru_cache
+# doesn't stop two racing first calls from both creating one.
+_CPU_POOL: Optional[ProcessPoolExecutor] = None
+_CPU_POOL_LOCK = threading.Lock()
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    """Returns the process pool used for CPU-bound work, created on first use."""
+    global _CPU_POOL
+    with _CPU_POOL_LOCK:
+        if _CPU_POOL is None:
+            # Forking a server that already runs executor threads can deadlock the child,
+            # so workers come from a clean forkserver process instead.
+            _CPU_POOL = ProcessPoolExecutor(mp_context=multiprocessing.get_context("forkserver"))
+        return _CPU_POOL
+
+async def _run_cpu_bound(size: int, func, *args):
+    """Runs func in the CPU pool when its input is large enough to hold up the event loop."""
+    if size <= _OFFLOAD_THRESHOLD:
+        return func(*args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_cpu_pool(), func, *args)
+
+async def close_shared_resources() -> None:
+    """Closes the pooled Ollama connections and the CPU pool, if they were created."""
+    if _get_client.cache_info().currsize:
+        await _get_client(OLLAMA_BASE_URL).close()
+        _get_client.cache_clear()
+    global _CPU_POOL
+    with _CPU_POOL_LOCK:
+        pool, _CPU_POOL = _CPU_POOL, None
+    if pool is not None:
+        pool.shutdown()
+
+async def _build_prompt_prefix(wsdl_id: str) -> str:
+    """Formats the part of every prompt that does not change between retries."""
+    if wsdl_id in _PREFIX_CACHE:
+        _PREFIX_CACHE.move_to_end(wsdl_id)
+        return _PREFIX_CACHE[wsdl_id]
+
+    wsdl_content = _load_wsdl(wsdl_id)
+    # Parse large WSDLs off the event loop so other requests keep being served.
+    compact = await _run_cpu_bound(len(wsdl_content), _minify_wsdl, wsdl_content)
+    prefix = "".join((_PREFIX_HEAD, compact, _PREFIX_TAIL))
+    _PREFIX_CACHE[wsdl_id] = prefix
+    if len(_PREFIX_CACHE) > _PREFIX_CACHE_SIZE:
+        _PREFIX_CACHE.popitem(last=False)
+    return prefix
 
 # --- Node Functions ---
 
+def errorable(node):
+    """Skips the node once an earlier node has failed and records its own failure in the state."""
+    if asyncio.iscoroutinefunction(node):
+        @wraps(node)
+        async def async_wrapper(state: GraphState) -> GraphState:
+            if state.get("error_message"):
+                return {}
+            try:
+                return await node(state)
+            except Exception as e:
+                logger.error("Error in %s: %s", node.__name__, e)
+                return {"error_message": str(e)}
+        return async_wrapper
+
+    @wraps(node)
+    def wrapper(state: GraphState) -> GraphState:
+        if state.get("error_message"):
+            return {}
+        try:
+            return node(state)
+        except Exception as e:
+            logger.error("Error in %s: %s", node.__name__, e)
+            return {"error_message": str(e)}
+    return wrapper
+
+@errorable
 def generate_initial_prompt(state: GraphState) -> GraphState:
-    """Generates the initial prompt for the LLM based on WSDL and user options."""
-    print("--- Generating Initial Prompt ---")
-    template = """
-    You are a world-class expert in SOAP API testing. Your task is to generate a comprehensive set of SOAP XML test cases based on the provided WSDL file.
-
-    The user has requested the following types of tests: {test_options}
-
-    Please adhere to these rules:
-    1. The output MUST be a single block of text.
-    2. Each individual test case MUST be a complete, valid XML SOAP envelope.
-    3. Wrap EACH SOAP envelope in its own `<testcase>` and `</testcase>` tags.
-    4. Populate the XML body with realistic and relevant sample data. For negative or edge cases, use data that tests those specific conditions (e.g., invalid formats, empty fields, oversized values).
-    5. Do NOT include any explanations, markdown formatting, or any other text outside of the `<testcase>` tags.
-
-    WSDL Content:
-    ```xml
-    {wsdl_content}
-    ```
-    """
-    prompt = PromptTemplate(
-        template=template,
-        input_variables=["test_options", "wsdl_content"],
-    ).format(
-        test_options=", ".join(state["test_options"]),
-        wsdl_content=state["wsdl_content"],
-    )
-    return {"prompt": prompt, "attempt_count": 1}
+    """Generates one initial prompt per requested test type."""
+    logger.debug("--- Generating Initial Prompt ---")
+    suffixes = [
+        "".join((_INITIAL_HEAD, option, _INITIAL_TAIL))
+        for option in state["test_options"]
+    ]
+    return {"prompt_suffixes": suffixes, "attempt_count": 1}
 
+@errorable
 def generate_with_feedback_prompt(state: GraphState) -> GraphState:
-    """Refines the prompt based on user feedback."""
-    print("--- Generating Prompt with Feedback ---")
-    template = """
-    You are a world-class expert in SOAP API testing. A previous attempt to generate SOAP tests was incorrect. Please try again, carefully considering the user's feedback.
-
-    User Feedback:
-    "{feedback}"
-
-    Original Request Details:
-    - Test Types: {test_options}
-    - Original WSDL:
-    ```xml
-    {wsdl_content}
-    ```
-
-    Please regenerate the tests, addressing the feedback provided. The output must be a single block of text. Each individual test case MUST be a complete, valid XML SOAP envelope, wrapped in its own `<testcase>` and `</testcase>` tags. Do NOT include any explanations, markdown formatting, or any other text outside of the `<testcase>` tags.
-    """
-    last_feedback = state["feedback_history"][-1]
-    prompt = PromptTemplate(
-        template=template,
-        input_variables=["feedback", "test_options", "wsdl_content"],
-    ).format(
-        feedback=last_feedback,
-        test_options=", ".join(state["test_options"]),
-        wsdl_content=state["wsdl_content"],
-    )
-    return {"prompt": prompt, "attempt_count": state["attempt_count"] + 1}
+    """Refines the per-test-type prompts based on user feedback and any validation errors."""
+    logger.debug("--- Generating Prompt with Feedback ---")
+    feedback_history = state["feedback_history"]
+    # An automatic retry regenerates only the failed test types, keeping the user's
+    # latest feedback and adding that type's own errors to fix.
+    retry_prompts = state.get("retry_prompts")
+    suffixes = []
+    for index, option in enumerate(state["test_options"]):
+        if retry_prompts and index not in retry_prompts:
+            suffixes.append(None)
+            continue
+        if feedback_history:
+            parts = (_FEEDBACK_HEAD, option, _FEEDBACK_MID, feedback_history[-1], _FEEDBACK_TAIL)
+        else:
+            parts = (_INITIAL_HEAD, option, _INITIAL_TAIL)
+        if retry_prompts:
+            parts += (_INVALID_XML_HEAD, "; ".join(state["validation_errors"][index]), _INVALID_XML_TAIL)
+        suffixes.append("".join(parts))
+    return {"prompt_suffixes": suffixes, "attempt_count": state["attempt_count"] + 1}
+
+_TESTCASE_OPEN = "<testcase>"
+_TESTCASE_CLOSE = "</testcase>"
+
+class _TestCaseSplitter:
+    """Extracts <testcase> blocks from streamed text as soon as each one is closed."""
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._content_start = -1  # Start of the open block's content, -1 outside a block
+        self._scan_from = 0  # Where the next tag search resumes, so no text is scanned twice
+
+    def feed(self, chunk: str) -> List[str]:
+        """Adds a chunk of output and returns the test cases it completed."""
+        self._buffer += chunk
+        completed = []
+        while True:
+            if self._content_start < 0:
+                open_at = self._buffer.find(_TESTCASE_OPEN, self._scan_from)
+                if open_at < 0:
+                    # Only a tag split across chunks can still match; drop the rest.
+                    self._buffer = self._buffer[-(len(_TESTCASE_OPEN) - 1):]
+                    self._scan_from = 0
+                    break
+                self._content_start = open_at + len(_TESTCASE_OPEN)
+                self._scan_from = self._content_start
+
+            close_at = self._buffer.find(_TESTCASE_CLOSE, self._scan_from)
+            if close_at < 0:
+                self._scan_from = max(self._content_start, len(self._buffer) - len(_TESTCASE_CLOSE) + 1)
+                break
+            completed.append(self._buffer[self._content_start:close_at])
+            self._buffer = self._buffer[close_at + len(_TESTCASE_CLOSE):]
+            self._content_start = -1
+            self._scan_from = 0
+        return completed
+
+# Matches a test case the model wrapped in a markdown code fence, capturing the body.
+_FENCE_RE = re.compile(r"^\s*```(?:xml)?\s*\n?(.*?)\n?```\s*$", re.DOTALL)
+
+def _clean_test_case(test_case: str) -> str:
+    """Strips whitespace and any markdown fence the model added despite the prompt."""
+    match = _FENCE_RE.match(test_case)
+    return (match.group(1) if match else test_case).strip()
+
+# Sampling is deterministic (temperature 0, fixed seed), so a repeated prompt
+# would produce the same response anyway.
+_RESPONSE_CACHE: "OrderedDict[str, Tuple[str, List[str]]]" = OrderedDict()
+
+def _response_cache_key(prompt: str) -> str:
+    digest = hashlib.sha256(LLM_MODEL.encode("utf-8"))
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+async def _generate(
+    client: AsyncClient, prompt: str, semaphore: asyncio.Semaphore
+) -> Tuple[str, List[str]]:
+    """Streams a single completion and returns it with the test cases split out as they arrived."""
+    cache_key = _response_cache_key(prompt)
+    if cache_key in _RESPONSE_CACHE:
+        logger.debug("Response cache hit")
+        _RESPONSE_CACHE.move_to_end(cache_key)
+        return _RESPONSE_CACHE[cache_key]
+
+    async with semaphore:
+        chunks = []
+        test_cases = []
+        splitter = _TestCaseSplitter()
+        stream = await client.generate(
+            model=LLM_MODEL,
+            prompt=prompt,
+            options=_LLM_OPTIONS,
+            keep_alive=LLM_KEEP_ALIVE,
+            stream=True,
+        )
+        try:
+            async for part in stream:
+                chunks.append(part["response"])
+                for test_case in splitter.feed(part["response"]):
+                    test_cases.append(_clean_test_case(test_case))
+                    logger.debug("Received test case %s", len(test_cases))
+        finally:
+            # Release the HTTP response on every exit, so a cancelled call stops Ollama decoding.
+            await stream.aclose()
+        result = ("".join(chunks), test_cases)
+
+    if LLM_CACHE_SIZE > 0:
+        _RESPONSE_CACHE[cache_key] = result
+        if len(_RESPONSE_CACHE) > LLM_CACHE_SIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+    return result
 
-def call_llm(state: GraphState) -> GraphState:
-    """Calls the LLM with the current prompt and updates the state."""
-    print(f"--- Calling LLM (Attempt {state['attempt_count']}) ---")
+@errorable
+async def call_llm(state: GraphState) -> GraphState:
+    """Runs the prompts concurrently, splitting each response into test cases while it streams."""
+    suffixes = state["prompt_suffixes"]
+    pending = [index for index, suffix in enumerate(suffixes) if suffix is not None]
+    logger.debug("--- Calling LLM (Attempt %s, %s prompts) ---", state["attempt_count"], len(pending))
+    # The prefix is cached per WSDL, so feedback runs reuse the same string.
+    prefix = await _build_prompt_prefix(state["wsdl_id"])
+    client = _get_client(OLLAMA_BASE_URL)
+    semaphore = asyncio.Semaphore(MAX_BATCH_SIZE)
+    tasks = [
+        asyncio.ensure_future(_generate(client, prefix + suffixes[index], semaphore))
+        for index in pending
+    ]
     try:
-        llm = Ollama(model=LLM_MODEL, base_url=OLLAMA_BASE_URL, temperature=0.1)
-        response = llm.invoke(state["prompt"])
-        return {"generated_xml": response, "error_message": None}
-    except Exception as e:
-        print(f"Error calling LLM: {e}")
-        return {"generated_xml": None, "error_message": str(e)}
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # gather leaves the other prompts running; cancel them and wait until their
+        # streams are closed before the failure is reported.
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
 
-def split_test_cases(state: GraphState) -> GraphState:
-    """Splits the raw LLM output into a list of individual XML test cases."""
-    print("--- Splitting Test Cases ---")
-    raw_xml = state.get("generated_xml")
-    if not raw_xml:
-        return {"generated_xmls": []}
+    # Test types that weren't regenerated keep their earlier test cases.
+    test_cases_by_prompt = list(state.get("test_cases_by_prompt") or [[] for _ in suffixes])
+    for index, (_, test_cases) in zip(pending, results):
+        test_cases_by_prompt[index] = test_cases
+    return {
+        "generated_xml": "\n".join(response for response, _ in results),
+        "test_cases_by_prompt": test_cases_by_prompt,
+        "generated_xmls": [test_case for test_cases in test_cases_by_prompt for test_case in test_cases],
+    }
 
-    # Find all content within <testcase>...</testcase> tags
-    test_cases = re.findall(r"<testcase>(.*?)</testcase>", raw_xml, re.DOTALL)
+# Never resolve entities or fetch anything while checking LLM output.
+_XML_VALIDATOR = etree.XMLParser(
+    huge_tree=True, recover=False, resolve_entities=False, no_network=True, collect_ids=False
+)
+
+def _find_xml_errors(test_cases_by_prompt: List[List[str]]) -> List[List[str]]:
+    """Describes every test case that is not well-formed XML, numbering them within each response."""
+    errors_by_prompt = []
+    for test_cases in test_cases_by_prompt:
+        errors = []
+        if not test_cases:
+            errors.append("no <testcase> blocks were found")
+        for index, test_case in enumerate(test_cases, start=1):
+            try:
+                etree.fromstring(test_case.encode("utf-8"), parser=_XML_VALIDATOR)
+            except etree.XMLSyntaxError as e:
+                errors.append(f"test case {index}: {e}")
+        errors_by_prompt.append(errors)
+    return errors_by_prompt
+
+@errorable
+def validate_xml(state: GraphState) -> GraphState:
+    """Checks the regenerated test cases are well-formed and queues the failed test types for a retry."""
+    logger.debug("--- Validating XML ---")
+    suffixes = state["prompt_suffixes"]
+    checked = [index for index, suffix in enumerate(suffixes) if suffix is not None]
+    test_cases_by_prompt = [state["test_cases_by_prompt"][index] for index in checked]
+    # LangGraph already runs sync nodes in a worker thread; large outputs go to the CPU
+    # pool as well so parsing them doesn't hold the GIL against the event loop.
+    if sum(len(test_case) for test_cases in test_cases_by_prompt for test_case in test_cases) > _OFFLOAD_THRESHOLD:
+        errors = _get_cpu_pool().submit(_find_xml_errors, test_cases_by_prompt).result()
+    else:
+        errors = _find_xml_errors(test_cases_by_prompt)
 
-    # Clean up whitespace
-    cleaned_test_cases = [case.strip() for case in test_cases]
+    # Test types that weren't regenerated keep their earlier result.
+    previous_errors = state.get("validation_errors") or [[] for _ in suffixes]
+    validation_errors = list(previous_errors)
+    for index, prompt_errors in zip(checked, errors):
+        validation_errors[index] = prompt_errors
 
-    return {"generated_xmls": cleaned_test_cases}
+    update = {"validation_errors": validation_errors, "retry_prompts": []}
+    # The retry prompt quotes the errors, so unchanged errors would repeat the last prompt
+    # byte for byte; with deterministic sampling and the response cache that retry is a no-op.
+    failed = [
+        index for index in checked
+        if validation_errors[index] and validation_errors[index] != previous_errors[index]
+    ]
+    if failed and state.get("auto_retry_count", 0) < MAX_AUTO_RETRIES:
+        update["retry_prompts"] = failed
+        update["auto_retry_count"] = state.get("auto_retry_count", 0) + 1
+    return update
 
 def pause_for_feedback(state: GraphState) -> GraphState:
     """A node that does nothing, used as a static breakpoint for human-in-the-loop."""
-    print("--- Pausing for feedback ---")
+    logger.debug("--- Pausing for feedback ---")
     return state
 
 # --- Conditional Edge Logic ---
 
 def decide_entry_point(state: GraphState) -> str:
     """Determines whether to start with an initial prompt or a feedback-based one."""
-    print("--- Deciding Entry Point ---")
+    logger.debug("--- Deciding Entry Point ---")
     if not state.get("feedback_history"):
         return "generate_initial_prompt"
     else:
         return "generate_with_feedback_prompt"
 
+def decide_after_validation(state: GraphState) -> str:
+    """Retries malformed output automatically until MAX_AUTO_RETRIES is used up."""
+    # After a failure every node is skipped, so validation errors from before it would loop forever.
+    if state.get("error_message"):
+        return "pause_for_feedback"
+    if state.get("retry_prompts"):
+        return "generate_with_feedback_prompt"
+    return "pause_for_feedback"
+
 # --- Assemble the Graph ---
 
-workflow = StateGraph(GraphState)
-
-# Add nodes
-workflow.add_node("generate_initial_prompt", generate_initial_prompt)
-workflow.add_node("generate_with_feedback_prompt", generate_with_feedback_prompt)
-workflow.add_node("call_llm", call_llm)
-workflow.add_node("split_test_cases", split_test_cases)
-workflow.add_node("pause_for_feedback", pause_for_feedback)
-
-# Set entry point
-workflow.set_conditional_entry_point(
-    decide_entry_point,
-    {
-        "generate_initial_prompt": "generate_initial_prompt",
-        "generate_with_feedback_prompt": "generate_with_feedback_prompt",
-    },
-)
+@lru_cache(maxsize=1)
+def _build_graph() -> CompiledStateGraph:
+    """Builds and compiles the graph once, on first use rather than at import."""
+    workflow = StateGraph(GraphState)
 
-# Add edges
-workflow.add_edge("generate_initial_prompt", "call_llm")
-workflow.add_edge("generate_with_feedback_prompt", "call_llm")
-workflow.add_edge("call_llm", "split_test_cases")
-workflow.add_edge("split_test_cases", "pause_for_feedback")
-workflow.add_edge("pause_for_feedback", END)
+    # Add nodes
+    workflow.add_node("generate_initial_prompt", generate_initial_prompt)
+    workflow.add_node("generate_with_feedback_prompt", generate_with_feedback_prompt)
+    workflow.add_node("call_llm", call_llm)
+    workflow.add_node("validate_xml", validate_xml)
+    workflow.add_node("pause_for_feedback", pause_for_feedback)
 
+    # Set entry point
+    workflow.set_conditional_entry_point(
+        decide_entry_point,
+        {
+            "generate_initial_prompt": "generate_initial_prompt",
+            "generate_with_feedback_prompt": "generate_with_feedback_prompt",
+        },
+    )
 
-# Compile the graph
-checkpointer = MemorySaver()
-graph_app = workflow.compile(
-    checkpointer=checkpointer,
-    interrupt_before=["pause_for_feedback"]
-)
+    # Add edges
+    workflow.add_edge("generate_initial_prompt", "call_llm")
+    workflow.add_edge("generate_with_feedback_prompt", "call_llm")
+    workflow.add_edge("call_llm", "validate_xml")
+    workflow.add_conditional_edges(
+        "validate_xml",
+        decide_after_validation,
+        {
+            "generate_with_feedback_prompt": "generate_with_feedback_prompt",
+            "pause_for_feedback": "pause_for_feedback",
+        },
+    )
+    workflow.add_edge("pause_for_feedback", END)
+
+    # Compile the graph
+    checkpointer = BoundedMemorySaver(max_entries=CHECKPOINT_MAX)
+    return workflow.compile(
+        checkpointer=checkpointer,
+        interrupt_before=["pause_for_feedback"]
+    )
+
+def __getattr__(name: str):
+    # Resolves `graph_app` lazily so importing this module does not compile the graph.
+    if name == "graph_app":
+        return _build_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,26 @@
 # backend/app/main.py
+import logging
+import os
 import uuid
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict
+from typing import List
 
 from .models import GenerationResponse, FeedbackRequest, FeedbackResponse
-from .graph_logic import graph_app, GraphState
+# graph_app is looked up on the module in each handler, so the graph is compiled on first use, not at import.
+from . import graph_logic
+from .graph_logic import GraphState, store_wsdl, close_shared_resources
 
-app = FastAPI(title="WSDL Test Generator API")
+# Node-level tracing is logged at DEBUG; set LOG_LEVEL=DEBUG to see it.
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"))
 
-# In-memory storage for graph states. In production, use Redis or a database.
-graph_sessions: Dict[str, List] = {}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_shared_resources()
+
+app = FastAPI(title="WSDL Test Generator API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +30,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _validation_errors(state: GraphState) -> List[str]:
+    """Labels each remaining well-formedness error with the test type it belongs to."""
+    return [
+        f"{option}: {error}"
+        for option, errors in zip(state["test_options"], state.get("validation_errors") or [])
+        for error in errors
+    ]
+
 @app.get("/api/health")
 def health_check():
     return {"status": "ok"}
@@ -34,34 +52,40 @@ async def create_generation(
     Accepts a WSDL file and test options, returns an initial result and a generation ID.
     """
     generation_id = str(uuid.uuid4())
-    wsdl_content = (await wsdl_file.read()).decode("utf-8")
+    # lxml reads the encoding from the XML declaration, so the upload is stored undecoded.
+    wsdl_content = await wsdl_file.read()
 
     initial_state: GraphState = {
-        "wsdl_content": wsdl_content,
+        "wsdl_id": store_wsdl(wsdl_content),
         "test_options": test_options,
         "feedback_history": [],
         "generated_xml": "",
+        "test_cases_by_prompt": [],
         "generated_xmls": [],
+        "validation_errors": [],
+        "retry_prompts": [],
         "error_message": "",
         "attempt_count": 0,
+        "auto_retry_count": 0,
     }
 
     config = {"configurable": {"thread_id": generation_id}}
 
     try:
-        # The stream method will now run the graph until it's interrupted
-        for _ in graph_app.stream(initial_state, config=config):
+        # The stream runs the graph until it's interrupted; in "values" mode the last
+        # item is the full final state, so it needn't be read back from the checkpointer.
+        final_state = None
+        async for final_state in graph_logic.graph_app.astream(initial_state, config=config, stream_mode="values"):
             pass
 
-        final_state = graph_app.get_state(config)
-
         if final_state is None:
             raise HTTPException(status_code=500, detail="Graph execution failed to produce a state.")
 
         return GenerationResponse(
             generationId=generation_id,
-            xmlContents=final_state.values.get("generated_xmls"),
-            errorMessage=final_state.values.get("error_message")
+            xmlContents=final_state.get("generated_xmls"),
+            errorMessage=final_state.get("error_message") or None,
+            validationErrors=_validation_errors(final_state) or None
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during graph execution: {e}")
@@ -78,35 +102,40 @@ async def regenerate_with_feedback(
     config = {"configurable": {"thread_id": generation_id}}
 
     # Retrieve the last state of the graph to get original context
-    current_state = graph_app.get_state(config)
+    current_state = await graph_logic.graph_app.aget_state(config)
 
-    if current_state is None:
+    # Unknown and evicted sessions come back as an empty snapshot.
+    if current_state is None or not current_state.values:
         raise HTTPException(status_code=404, detail="Generation ID not found.")
 
     # Start a new run with the updated feedback history
     new_initial_state = {
-        "wsdl_content": current_state.values["wsdl_content"],
+        "wsdl_id": current_state.values["wsdl_id"],
         "test_options": current_state.values["test_options"],
         "feedback_history": current_state.values["feedback_history"] + [request.feedback],
         "generated_xml": "",
+        "test_cases_by_prompt": [],
         "generated_xmls": [],
+        "validation_errors": [],
+        "retry_prompts": [],
         "error_message": "",
         "attempt_count": 0,
+        "auto_retry_count": 0,
     }
 
     try:
         # Run the graph from the beginning with the new feedback
-        for _ in graph_app.stream(new_initial_state, config=config):
+        final_state = None
+        async for final_state in graph_logic.graph_app.astream(new_initial_state, config=config, stream_mode="values"):
             pass
 
-        final_state = graph_app.get_state(config)
-
         if final_state is None:
             raise HTTPException(status_code=500, detail="Graph execution failed to produce a state.")
 
         return FeedbackResponse(
-            xmlContents=final_state.values.get("generated_xmls"),
-            errorMessage=final_state.values.get("error_message")
+            xmlContents=final_state.get("generated_xmls"),
+            errorMessage=final_state.get("error_message") or None,
+            validationErrors=_validation_errors(final_state) or None
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred during graph resumption: {e}")
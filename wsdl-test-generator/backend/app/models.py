@@ -6,6 +6,7 @@ class GenerationResponse(BaseModel):
     generationId: str
     xmlContents: Optional[List[str]] = None
     errorMessage: Optional[str] = None
+    validationErrors: Optional[List[str]] = None  # Malformed test cases left after the automatic retries
 
 class FeedbackRequest(BaseModel):
     feedback: str
@@ -13,3 +14,4 @@ class FeedbackRequest(BaseModel):
 class FeedbackResponse(BaseModel):
     xmlContents: Optional[List[str]] = None
     errorMessage: Optional[str] = None
+    validationErrors: Optional[List[str]] = None
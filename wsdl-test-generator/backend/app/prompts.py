@@ -0,0 +1,35 @@
+# backend/app/prompts.py
+
+# Instructions and WSDL shared by every prompt of a generation.
+PREFIX_TEMPLATE = """
+    You are a world-class expert in SOAP API testing. Your task is to generate a comprehensive set of SOAP XML test cases based on the provided WSDL file.
+
+    Please adhere to these rules:
+    1. The output MUST be a single block of text.
+    2. Each individual test case MUST be a complete, valid XML SOAP envelope.
+    3. Wrap EACH SOAP envelope in its own `<testcase>` and `</testcase>` tags.
+    4. Populate the XML body with realistic and relevant sample data. For negative or edge cases, use data that tests those specific conditions (e.g., invalid formats, empty fields, oversized values).
+    5. Do NOT include any explanations, markdown formatting, or any other text outside of the `<testcase>` tags.
+
+    WSDL Content:
+    ```xml
+    {wsdl_content}
+    ```
+    """
+
+INITIAL_TEMPLATE = """
+    The user has requested the following type of tests: {test_option}
+    """
+
+# Assembled once at import; the feedback suffix extends the initial one.
+FEEDBACK_TEMPLATE = INITIAL_TEMPLATE + """
+    A previous attempt to generate these tests was incorrect. Please try again, carefully considering the user's feedback.
+
+    User Feedback:
+    "{feedback}"
+    """
+
+# Appended to the retry prompt when the output was not well-formed XML, after any user feedback.
+INVALID_XML_FEEDBACK_TEMPLATE = """
+    The previous output was not well-formed XML. Make sure every test case parses, fixing these errors: {errors}
+    """
@@ -0,0 +1,39 @@
+# backend/app/test_checkpointer.py
+import unittest
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from app.checkpointer import BoundedMemorySaver
+
+
+def config_for(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+class BoundedMemorySaverTest(unittest.TestCase):
+    def setUp(self):
+        self.saver = BoundedMemorySaver(max_entries=2)
+
+    def put(self, thread_id):
+        self.saver.put(config_for(thread_id), empty_checkpoint(), {})
+
+    def test_least_recently_written_thread_is_evicted(self):
+        self.put("a")
+        self.put("b")
+        self.put("a")
+        self.put("c")
+        self.assertEqual(set(self.saver.storage), {"a", "c"})
+        self.assertIsNone(self.saver.get_tuple(config_for("b")))
+        self.assertIsNotNone(self.saver.get_tuple(config_for("a")))
+
+    def test_lookup_of_unknown_or_evicted_thread_leaves_storage_unchanged(self):
+        self.put("a")
+        self.put("b")
+        self.put("c")
+        self.assertIsNone(self.saver.get_tuple(config_for("a")))
+        self.assertIsNone(self.saver.get_tuple(config_for("unknown")))
+        self.assertEqual(set(self.saver.storage), {"b", "c"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,8 @@
 # backend/app/test_graph.py
-from app.graph_logic import graph_app, GraphState
+import asyncio
+import logging
+
+from app.graph_logic import graph_app, GraphState, store_wsdl
 
 # A sample WSDL for testing purposes
 sample_wsdl = """
@@ -39,23 +42,33 @@ sample_wsdl = """
 """
 
 # --- Test Execution ---
-if __name__ == "__main__":
+async def main():
     print("--- Starting Graph Test ---")
 
+    wsdl_id = store_wsdl(sample_wsdl.encode("utf-8"))
+
     initial_state: GraphState = {
-        "wsdl_content": sample_wsdl,
+        "wsdl_id": wsdl_id,
         "test_options": ["happy_path", "negative case with zero"],
         "feedback_history": [],
+        "generated_xml": "",
+        "test_cases_by_prompt": [],
+        "generated_xmls": [],
+        "validation_errors": [],
+        "retry_prompts": [],
+        "error_message": "",
+        "attempt_count": 0,
+        "auto_retry_count": 0,
     }
 
     config = {"configurable": {"thread_id": "test-thread-1"}}
 
     # 1. Initial run
     print("\n--- [Step 1] Initial Generation ---")
-    for _ in graph_app.stream(initial_state, config=config):
+    async for _ in graph_app.astream(initial_state, config=config):
         pass
 
-    final_state = graph_app.get_state(config)
+    final_state = await graph_app.aget_state(config)
     print("\n--- [Step 1] Result ---")
     print("Generated XML:", final_state.values.get("generated_xml"))
     print("Error Message:", final_state.values.get("error_message"))
@@ -71,19 +84,34 @@ if __name__ == "__main__":
     # For this test, we will just start a new run with the feedback in the history.
 
     new_initial_state = {
-        "wsdl_content": sample_wsdl,
+        "wsdl_id": wsdl_id,
         "test_options": ["happy_path", "negative case with zero"],
         "feedback_history": [user_feedback],
+        "generated_xml": "",
+        "test_cases_by_prompt": [],
+        "generated_xmls": [],
+        "validation_errors": [],
+        "retry_prompts": [],
+        "error_message": "",
+        "attempt_count": 0,
+        "auto_retry_count": 0,
     }
 
     resumed_final_state = None
-    for _ in graph_app.stream(new_initial_state, config=config):
+    async for _ in graph_app.astream(new_initial_state, config=config):
         pass
 
-    resumed_final_state = graph_app.get_state(config)
+    resumed_final_state = await graph_app.aget_state(config)
     print("\n--- [Step 2] Result after Feedback ---")
     print("Regenerated XML:", resumed_final_state.values.get("generated_xml"))
     print("Error Message:", resumed_final_state.values.get("error_message"))
     print(f"Total attempts: {resumed_final_state.values.get('attempt_count')}")
 
     print("\n--- Graph Test Finished ---")
+
+if __name__ == "__main__":
+    # Show the graph's node-by-node progress without the HTTP client's debug noise.
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("app.graph_logic").setLevel(logging.DEBUG)
+    # The graph's LLM node is async, so the whole run shares one event loop.
+    asyncio.run(main())
@@ -0,0 +1,238 @@
+# backend/app/test_graph_logic.py
+import asyncio
+import random
+import re
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from app import graph_logic
+from app.test_graph import sample_wsdl
+
+VALID_CASE = "<testcase><soap:Envelope xmlns:soap=\"http://schemas.xmlsoap.org/soap/envelope/\"/></testcase>"
+MALFORMED_CASE = "<testcase><soap:Envelope></testcase>"
+
+
+class StubClient:
+    """Stands in for the Ollama client, streaming canned responses or raising canned errors.
+
+    Responses passed by keyword are only used for prompts asking for that test option.
+    """
+
+    def __init__(self, *responses, **responses_by_option):
+        self.responses = list(responses)
+        self.responses_by_option = {option: list(queue) for option, queue in responses_by_option.items()}
+        self.prompts = []
+
+    async def generate(self, **kwargs):
+        prompt = kwargs["prompt"]
+        self.prompts.append(prompt)
+        queue = next(
+            (queue for option, queue in self.responses_by_option.items() if f"type of tests: {option}\n" in prompt),
+            self.responses,
+        )
+        response = queue.pop(0)
+        if isinstance(response, Exception):
+            raise response
+
+        async def stream():
+            for start in range(0, len(response), 5):
+                yield {"response": response[start:start + 5]}
+        return stream()
+
+
+def run_graph(client, feedback_history=(), test_options=("happy_path",)):
+    """Runs the graph to its interrupt with the given client and returns the final state."""
+    state = {
+        "wsdl_id": graph_logic.store_wsdl(sample_wsdl.encode("utf-8")),
+        "test_options": list(test_options),
+        "feedback_history": list(feedback_history),
+        "generated_xml": "",
+        "test_cases_by_prompt": [],
+        "generated_xmls": [],
+        "validation_errors": [],
+        "retry_prompts": [],
+        "error_message": "",
+        "attempt_count": 0,
+        "auto_retry_count": 0,
+    }
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+
+    async def run():
+        final_state = None
+        async for final_state in graph_logic.graph_app.astream(state, config=config, stream_mode="values"):
+            pass
+        return final_state
+
+    graph_logic._RESPONSE_CACHE.clear()
+    with mock.patch.object(graph_logic, "_get_client", return_value=client):
+        return asyncio.run(run())
+
+
+class TestCaseSplitterTest(unittest.TestCase):
+    # The non-streaming split the splitter replaced; both must find the same blocks.
+    TESTCASE_RE = re.compile(r"<testcase>(.*?)</testcase>", re.DOTALL)
+    FRAGMENTS = ["<testcase>", "</testcase>", "<test", "case>", "</test", "<", ">", "/", "x", "\n", "<a/>"]
+
+    def test_matches_regex_on_randomly_chunked_input(self):
+        rng = random.Random(0)
+        for _ in range(3000):
+            text = "".join(rng.choice(self.FRAGMENTS) for _ in range(rng.randint(0, 40)))
+            splitter = graph_logic._TestCaseSplitter()
+            found = []
+            start = 0
+            while start < len(text):
+                end = start + rng.randint(1, 12)
+                found.extend(splitter.feed(text[start:end]))
+                start = end
+            self.assertEqual(found, self.TESTCASE_RE.findall(text), text)
+
+
+class GraphRoutingTest(unittest.TestCase):
+    def test_valid_output_pauses_for_feedback(self):
+        final_state = run_graph(StubClient(VALID_CASE))
+        self.assertEqual(len(final_state["generated_xmls"]), 1)
+        self.assertEqual(final_state["validation_errors"], [[]])
+
+    def test_malformed_output_is_retried(self):
+        client = StubClient(MALFORMED_CASE, VALID_CASE)
+        final_state = run_graph(client)
+        self.assertEqual(len(client.prompts), 2)
+        self.assertIn("not well-formed XML", client.prompts[1])
+        self.assertEqual(final_state["validation_errors"], [[]])
+
+    def test_retry_keeps_user_feedback(self):
+        client = StubClient(MALFORMED_CASE, VALID_CASE)
+        final_state = run_graph(client, feedback_history=["Use negative quantities"])
+        self.assertIn("Use negative quantities", client.prompts[1])
+        self.assertIn("not well-formed XML", client.prompts[1])
+        self.assertEqual(final_state["feedback_history"], ["Use negative quantities"])
+
+    def test_only_failed_test_types_are_retried(self):
+        client = StubClient(
+            happy_path=[VALID_CASE + VALID_CASE],
+            negative=[VALID_CASE + VALID_CASE + MALFORMED_CASE, VALID_CASE],
+        )
+        final_state = run_graph(client, test_options=["happy_path", "negative"])
+        self.assertEqual(len(client.prompts), 3)
+        retry_prompt = client.prompts[2]
+        self.assertIn("type of tests: negative\n", retry_prompt)
+        # Errors are numbered within the failed response, not across all of them.
+        self.assertIn("fixing these errors: test case 3:", retry_prompt)
+        self.assertEqual([len(cases) for cases in final_state["test_cases_by_prompt"]], [2, 1])
+        self.assertEqual(len(final_state["generated_xmls"]), 3)
+        self.assertEqual(final_state["validation_errors"], [[], []])
+
+    def test_retry_stops_when_errors_repeat(self):
+        # The second retry prompt would be identical to the first, so it isn't sent.
+        client = StubClient(MALFORMED_CASE, MALFORMED_CASE, VALID_CASE)
+        final_state = run_graph(client)
+        self.assertEqual(len(client.prompts), 2)
+        self.assertEqual(final_state["auto_retry_count"], 1)
+        self.assertEqual(len(final_state["validation_errors"][0]), 1)
+
+    def test_failure_during_retry_pauses_with_error(self):
+        client = StubClient(MALFORMED_CASE, ConnectionError("ollama down"))
+        final_state = run_graph(client)
+        self.assertEqual(len(client.prompts), 2)
+        self.assertEqual(final_state["error_message"], "ollama down")
+
+
+class GenerateTest(unittest.TestCase):
+    def test_commentary_between_test_cases_is_skipped(self):
+        commentary = "\nThe next case sends an empty request, which the service should reject.\n" * 5
+        client = StubClient(VALID_CASE + commentary + VALID_CASE + commentary)
+        graph_logic._RESPONSE_CACHE.clear()
+        _, test_cases = asyncio.run(graph_logic._generate(client, "prompt", asyncio.Semaphore(1)))
+        self.assertEqual(len(test_cases), 2)
+
+
+class CallLlmTest(unittest.TestCase):
+    def test_failed_prompt_cancels_the_others(self):
+        closed = []
+
+        class Client:
+            async def generate(self, prompt, **kwargs):
+                if prompt.endswith("negative"):
+                    await asyncio.sleep(0.01)
+                    raise ConnectionError("ollama down")
+
+                async def stream():
+                    try:
+                        while True:
+                            await asyncio.sleep(0.001)
+                            yield {"response": "x"}
+                    finally:
+                        closed.append(prompt)
+                return stream()
+
+        state = {
+            "wsdl_id": graph_logic.store_wsdl(sample_wsdl.encode("utf-8")),
+            "prompt_suffixes": ["happy_path", "negative"],
+            "attempt_count": 1,
+        }
+
+        async def run():
+            update = await graph_logic.call_llm(state)
+            # The surviving stream must already be closed when call_llm returns.
+            return update, len(closed)
+
+        graph_logic._RESPONSE_CACHE.clear()
+        with mock.patch.object(graph_logic, "_get_client", return_value=Client()):
+            update, closed_on_return = asyncio.run(run())
+        self.assertEqual(update, {"error_message": "ollama down"})
+        self.assertEqual(closed_on_return, 1)
+
+
+class CpuPoolTest(unittest.TestCase):
+    def test_concurrent_first_use_creates_one_pool(self):
+        created = []
+
+        def slow_pool(**kwargs):
+            time.sleep(0.01)
+            created.append(object())
+            return created[-1]
+
+        barrier = threading.Barrier(8)
+        pools = []
+
+        def get_pool():
+            barrier.wait()
+            pools.append(graph_logic._get_cpu_pool())
+
+        with mock.patch.object(graph_logic, "ProcessPoolExecutor", side_effect=slow_pool), \
+                mock.patch.object(graph_logic, "_CPU_POOL", None):
+            threads = [threading.Thread(target=get_pool) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(created), 1)
+        self.assertTrue(all(pool is created[0] for pool in pools))
+
+
+class ApiTest(unittest.TestCase):
+    def test_remaining_validation_errors_are_returned(self):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        graph_logic._RESPONSE_CACHE.clear()
+        client = StubClient(happy_path=[VALID_CASE], negative=[MALFORMED_CASE, MALFORMED_CASE])
+        with mock.patch.object(graph_logic, "_get_client", return_value=client):
+            response = TestClient(app).post(
+                "/api/generations",
+                files={"wsdl_file": ("service.wsdl", sample_wsdl)},
+                data={"test_options": ["happy_path", "negative"]},
+            )
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(body["errorMessage"])
+        self.assertEqual(len(body["xmlContents"]), 2)
+        self.assertEqual(len(body["validationErrors"]), 1)
+        self.assertTrue(body["validationErrors"][0].startswith("negative: test case 1:"))
+
+
+if __name__ == "__main__":
+    unittest.main()
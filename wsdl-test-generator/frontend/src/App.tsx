@@ -29,6 +29,7 @@ function App() {
   const [xmlContents, setXmlContents] = useState<string[]>([]);
   const [generationId, setGenerationId] = useState('');
   const [errorMessage, setErrorMessage] = useState('');
+  const [validationErrors, setValidationErrors] = useState<string[]>([]);
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
   const [testOptions, setTestOptions] = useState<string[]>([]);
   const [feedbackText, setFeedbackText] = useState('');
@@ -55,6 +56,7 @@ function App() {
     }
     setIsLoading(true);
     setErrorMessage('');
+    setValidationErrors([]);
     setXmlContents([]);
     try {
       const response = await generateTests(selectedFile, testOptions);
@@ -62,6 +64,7 @@ function App() {
         setErrorMessage(response.errorMessage);
       } else {
         setXmlContents(response.xmlContents || []);
+        setValidationErrors(response.validationErrors || []);
         setGenerationId(response.generationId);
       }
     } catch (error: any) {
@@ -75,12 +78,14 @@ function App() {
     if (!feedbackText || !generationId) return;
     setIsLoading(true);
     setErrorMessage('');
+    setValidationErrors([]);
     try {
       const response = await submitFeedback(generationId, feedbackText);
       if (response.errorMessage) {
         setErrorMessage(response.errorMessage);
       } else {
         setXmlContents(response.xmlContents || []);
+        setValidationErrors(response.validationErrors || []);
         setFeedbackText('');
       }
     } catch (error: any) {
@@ -144,6 +149,14 @@ function App() {
 
         {isLoading && <Box sx={{ display: 'flex', justifyContent: 'center', my: 4 }}><CircularProgress /></Box>}
         {errorMessage && <Alert severity="error" sx={{ my: 2 }}>{errorMessage}</Alert>}
+        {validationErrors.length > 0 && (
+          <Alert severity="warning" sx={{ my: 2 }}>
+            Some test cases are not well-formed XML:
+            <ul>
+              {validationErrors.map((error, index) => <li key={index}>{error}</li>)}
+            </ul>
+          </Alert>
+        )}
 
         {xmlContents.length > 0 && (
           <Paper elevation={3} sx={{ p: 3 }}>
@@ -13,11 +13,13 @@ export interface GenerationResponse {
   generationId: string;
   xmlContents?: string[];
   errorMessage?: string;
+  validationErrors?: string[];
 }
 
 export interface FeedbackResponse {
   xmlContents?: string[];
   errorMessage?: string;
+  validationErrors?: string[];
 }
 
 // --- API Functions ---